@@ -1,15 +1,40 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional, Dict
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ValidationError
+from typing import Any, List, Optional, Dict
+import aiohttp
 import anthropic
-import httpx
-import json
+import asyncio
+import hashlib
+import orjson
 import os
-from datetime import datetime
+import time
+from string import Template
 from uuid import uuid4
+from cachetools import TTLCache
+from claude_client import ClaudeClient, ClaudeOverloaded, tool_use_input
+from phi_redaction import redact_phi, restore_phi
 
-app = FastAPI(title="PriorAuth TAO", description="Decentralized prior authorization automation agent on Bittensor/TAO subnet")
-client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY", ""))
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+  # One pooled session for CMS lookups instead of a fresh TCP+TLS handshake per request
+  app.state.http = aiohttp.ClientSession(
+    connector=aiohttp.TCPConnector(limit=200, ttl_dns_cache=300),
+    timeout=aiohttp.ClientTimeout(total=10)
+  )
+  yield
+  await app.state.http.close()
+
+app = FastAPI(title="PriorAuth TAO", description="Decentralized prior authorization automation agent on Bittensor/TAO subnet", lifespan=lifespan)
+aclient = anthropic.AsyncAnthropic(api_key=os.environ.get("ANTHROPIC_API_KEY", ""))
+claude = ClaudeClient(aclient, max_queue_size=256, max_concurrency=128)
+# Largest batch answered in real time when the Batches API is down; bigger ones get a 503
+REALTIME_FALLBACK_LIMIT = 32
+
+@app.exception_handler(ClaudeOverloaded)
+async def claude_overloaded_handler(request, exc: ClaudeOverloaded):
+  return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
 
 class PARequest(BaseModel):
   patient_age: int
@@ -31,6 +56,13 @@ class PADecision(BaseModel):
   appeal_guidance: Optional[str]
   confidence: float
   processing_time_ms: int
+  model: Optional[str] = None  # which tier answered; kept for score calibration
+
+class PABatchJob(BaseModel):
+  batch_id: Optional[str]
+  status: str
+  request_ids: List[str] = []
+  decisions: List[PADecision] = []
 
 class SubnetStatus(BaseModel):
   subnet_id: str
@@ -39,6 +71,8 @@ class SubnetStatus(BaseModel):
   requests_processed_24h: int
   approval_rate: float
   network: str
+  cache_hit_rate: float
+  admission_queue: Dict[str, Any]
 
 class AppealRequest(BaseModel):
   original_request_id: str
@@ -62,105 +96,365 @@ PA_CRITERIA_DB = {
   "E11.9": {"name": "Type 2 diabetes", "common_criteria": ["BMI documented", "Metformin trial", "A1c monitoring"]},
 }
 
-async def verify_insurance_criteria(plan: str, procedure: str) -> dict:
-  async with httpx.AsyncClient() as hclient:
-    try:
-      url = "https://www.cms.gov/medicare-coverage-database/api/articles"
-      params = {"keyword": procedure, "type": "all", "format": "json"}
-      r = await hclient.get(url, params=params, timeout=10)
-      if r.status_code == 200:
-        return {"source": "CMS", "criteria": r.json()}
-      return {"source": "CMS", "status": "no specific criteria found", "plan": plan}
-    except:
-      return {"source": "fallback", "plan": plan, "procedure": procedure}
+# Commercial payers for which the CMS (Medicare) coverage database is not the governing policy.
+# For a PA_CRITERIA_DB diagnosis they skip the CMS lookup and are judged on the prompt's
+# "Known PA Criteria" line alone; no payer-specific policy data is held locally. Medicare is
+# deliberately absent: its coverage comes from the CMS database.
+LOCAL_POLICY_PLANS = frozenset({"unitedhealthcare", "aetna", "cigna", "bcbs", "humana"})
 
-@app.post("/submit-pa", response_model=PADecision)
-async def submit_prior_auth(request: PARequest):
-  start_time = datetime.utcnow()
-  request_id = f"PA-{str(uuid4())[:8].upper()}"
-  criteria_info = PA_CRITERIA_DB.get(request.diagnosis_code, {})
-  insurance_criteria = await verify_insurance_criteria(request.insurance_plan, request.procedure_code)
+# Flat per-field views of PA_CRITERIA_DB so the request path is two O(1) lookups
+CRITERIA_NAME = {code: info["name"] for code, info in PA_CRITERIA_DB.items()}
+CRITERIA_LIST = {code: info["common_criteria"] for code, info in PA_CRITERIA_DB.items()}
+CRITERIA_LIST_JSON = {code: orjson.dumps(criteria).decode() for code, criteria in CRITERIA_LIST.items()}
 
-  prompt = f"""You are an AI prior authorization decision engine on the Bittensor TAO subnet.
+PA_PROMPT_TEMPLATE = Template("""You are an AI prior authorization decision engine on the Bittensor TAO subnet.
 Process this PA request using evidence-based medical criteria and insurance guidelines.
 
-Request ID: {request_id}
-Patient Age: {request.patient_age}
-Diagnosis ICD-10: {request.diagnosis_code} - {criteria_info.get('name', 'unknown')}
-Procedure/Medication: {request.procedure_code} / {request.medication or 'N/A'}
-Insurance Plan: {request.insurance_plan}
-Clinical Notes: {request.clinical_notes or 'not provided'}
-Previous Treatments: {request.previous_treatments or []}
-Known PA Criteria for this diagnosis: {criteria_info.get('common_criteria', [])}
-CMS Coverage Data: {insurance_criteria}
-
-Make a prior authorization decision. Respond as JSON:
-{{
-  "status": "APPROVED/DENIED/PENDING_INFO",
-  "decision": "brief decision statement",
-  "rationale": "detailed clinical rationale",
-  "criteria_met": ["criterion1"],
-  "criteria_missing": ["missing1"],
-  "alternative_recommendations": ["alternative1"],
-  "appeal_guidance": "guidance if denied, null if approved",
-  "confidence": 0.0
-}}"""
-
-  response = client.messages.create(
-    model="claude-opus-4-5",
-    max_tokens=1500,
-    messages=[{"role": "user", "content": prompt}]
-  )
-  text = response.content[0].text
-  start = text.find("{")
-  end = text.rfind("}") + 1
+Request ID: $request_id
+Patient Age: $patient_age
+Diagnosis ICD-10: $diagnosis_code - $diagnosis_name
+Procedure/Medication: $procedure_code / $medication
+Insurance Plan: $insurance_plan
+Clinical Notes: $clinical_notes
+Previous Treatments: $previous_treatments
+Known PA Criteria for this diagnosis: $known_criteria
+Coverage Data: $insurance_criteria
+
+Make a prior authorization decision and record it with the record_pa_decision tool.""")
+
+APPEAL_PROMPT_TEMPLATE = Template("""You are a prior authorization appeal specialist AI agent.
+
+Original Request ID: $original_request_id
+Denial Reason: $denial_reason
+Additional Clinical Evidence: $additional_clinical_evidence
+Physician Statement: $physician_statement
+
+Analyze this appeal and record your strategic guidance with the record_appeal_analysis tool.""")
+
+# Tool schemas mirror PADecision/AppealAnalysis so Claude returns structured input, not prose
+RECORD_PA_DECISION_TOOL = {
+  "name": "record_pa_decision",
+  "description": "Record the prior authorization decision for this request.",
+  "input_schema": {
+    "type": "object",
+    "properties": {
+      "status": {"type": "string", "enum": ["APPROVED", "DENIED", "PENDING_INFO"]},
+      "decision": {"type": "string", "description": "Brief decision statement"},
+      "rationale": {"type": "string", "description": "Clinical rationale in 2-4 sentences"},
+      "criteria_met": {"type": "array", "items": {"type": "string"}},
+      "criteria_missing": {"type": "array", "items": {"type": "string"}},
+      "alternative_recommendations": {"type": "array", "items": {"type": "string"}},
+      "appeal_guidance": {"type": ["string", "null"], "description": "Guidance if denied, null if approved"},
+      "confidence": {"type": "number", "minimum": 0, "maximum": 1}
+    },
+    "required": ["status", "decision", "rationale", "criteria_met", "criteria_missing", "alternative_recommendations", "appeal_guidance", "confidence"]
+  }
+}
+
+RECORD_APPEAL_ANALYSIS_TOOL = {
+  "name": "record_appeal_analysis",
+  "description": "Record the strategic analysis of this prior authorization appeal.",
+  "input_schema": {
+    "type": "object",
+    "properties": {
+      "likelihood_of_success": {"type": "number", "minimum": 0, "maximum": 1},
+      "strongest_arguments": {"type": "array", "items": {"type": "string"}},
+      "required_documentation": {"type": "array", "items": {"type": "string"}},
+      "recommended_approach": {"type": "string"},
+      "estimated_review_days": {"type": "integer", "minimum": 0}
+    },
+    "required": ["likelihood_of_success", "strongest_arguments", "required_documentation", "recommended_approach", "estimated_review_days"]
+  }
+}
+
+# (model, max_tokens) per complexity tier; Opus is reserved for PAs the local criteria can't anchor
+SIMPLE_PA_MODEL = ("claude-haiku-4-5", 1024)
+STANDARD_PA_MODEL = ("claude-sonnet-4-5", 1024)
+COMPLEX_PA_MODEL = ("claude-opus-4-5", 1500)
+
+def choose_model(request: PARequest) -> tuple[str, int]:
+  known_diagnosis = request.diagnosis_code in CRITERIA_LIST
+  if known_diagnosis and not request.clinical_notes:
+    return SIMPLE_PA_MODEL
+  if known_diagnosis or not request.clinical_notes:
+    return STANDARD_PA_MODEL
+  return COMPLEX_PA_MODEL
+
+DECISION_MISSING = "No structured decision recorded"
+
+# Clinically equivalent PAs (same codes, plan, age, treatments and notes) get the same answer
+DECISION_CACHE = TTLCache(maxsize=4096, ttl=3600)
+CACHE_CONFIDENCE_CAP = 0.9
+cache_stats = {"hits": 0, "misses": 0}
+
+def decision_cache_key(request: PARequest, model: str) -> str:
+  fields = [
+    model,
+    request.diagnosis_code.strip().upper(),
+    request.procedure_code.strip().upper(),
+    (request.medication or "").strip().lower(),
+    request.insurance_plan.strip().lower(),
+    request.patient_age,
+    sorted({t.strip().lower() for t in request.previous_treatments or []}),
+    " ".join((request.clinical_notes or "").lower().split()),
+  ]
+  return hashlib.sha256(orjson.dumps(fields)).hexdigest()
+
+# CMS coverage articles change on the order of days; only definitive answers are cached
+CMS_CACHE = TTLCache(maxsize=1024, ttl=3600)
+CMS_TOP_K = 5
+
+def summarize_cms(data):
+  """Keep only the first CMS_TOP_K items of each result list so the prompt stays small."""
+  if isinstance(data, list):
+    return data[:CMS_TOP_K]
+  if isinstance(data, dict):
+    return {key: value[:CMS_TOP_K] if isinstance(value, list) else value for key, value in data.items()}
+  return data
+
+async def verify_insurance_criteria(plan: str, procedure: str, session: aiohttp.ClientSession) -> dict:
+  cached = CMS_CACHE.get((plan, procedure))
+  if cached is not None:
+    return cached
   try:
-    result = json.loads(text[start:end])
-  except json.JSONDecodeError:
-    result = {"status": "PENDING_INFO", "decision": "Manual review required", "rationale": text, "criteria_met": [], "criteria_missing": ["Unable to parse decision"], "alternative_recommendations": [], "appeal_guidance": None, "confidence": 0.3}
+    url = "https://www.cms.gov/medicare-coverage-database/api/articles"
+    params = {"keyword": procedure, "type": "all", "format": "json"}
+    async with session.get(url, params=params) as r:
+      status = r.status
+      if status == 200:
+        result = {"source": "CMS", "criteria": summarize_cms(await r.json(loads=orjson.loads, content_type=None))}
+      else:
+        result = {"source": "CMS", "status": "no specific criteria found", "plan": plan}
+  except Exception:
+    return {"source": "fallback", "plan": plan, "procedure": procedure}
+  # Only a real answer or a definitive miss is pinned; 429/408 and other transient 4xx retry next time
+  if status in (200, 404):
+    CMS_CACHE[(plan, procedure)] = result
+  return result
+
+def local_policy_criteria(request: PARequest) -> Optional[dict]:
+  """A short local-source marker when the diagnosis is in PA_CRITERIA_DB and the payer is in
+  LOCAL_POLICY_PLANS, else None. The criteria themselves are already in the prompt."""
+  plan = request.insurance_plan.strip().lower()
+  if request.diagnosis_code not in CRITERIA_LIST or plan not in LOCAL_POLICY_PLANS:
+    return None
+  return {"source": "local", "plan": request.insurance_plan}
+
+async def insurance_criteria_for(request: PARequest) -> dict:
+  return local_policy_criteria(request) or await verify_insurance_criteria(request.insurance_plan, request.procedure_code, app.state.http)
+
+def build_pa_prompt(request: PARequest, request_id: str, insurance_criteria: dict, redact: bool = True) -> tuple[str, tuple]:
+  """Render the PA prompt with PHI in notes/treatments swapped for typed placeholders.
 
-  end_time = datetime.utcnow()
-  processing_ms = int((end_time - start_time).total_seconds() * 1000)
+  With redact=False the text is sent as-is and no placeholder map is returned.
+  """
+  texts = (request.clinical_notes or "not provided", *(request.previous_treatments or []))
+  redacted, placeholders = redact_phi(*texts) if redact else (texts, ())
+  prompt = PA_PROMPT_TEMPLATE.substitute(
+    request_id=request_id,
+    patient_age=request.patient_age,
+    diagnosis_code=request.diagnosis_code,
+    diagnosis_name=CRITERIA_NAME.get(request.diagnosis_code, "unknown"),
+    procedure_code=request.procedure_code,
+    medication=request.medication or "N/A",
+    insurance_plan=request.insurance_plan,
+    clinical_notes=redacted[0],
+    previous_treatments=orjson.dumps(redacted[1:]).decode(),
+    known_criteria=CRITERIA_LIST_JSON.get(request.diagnosis_code, "[]"),
+    insurance_criteria=orjson.dumps(insurance_criteria).decode()
+  )
+  return prompt, placeholders
+
+def pa_message_params(prompt: str, model: str, max_tokens: int) -> dict:
+  return {
+    "model": model,
+    "max_tokens": max_tokens,
+    "messages": [{"role": "user", "content": prompt}],
+    "tools": [RECORD_PA_DECISION_TOOL],
+    "tool_choice": {"type": "tool", "name": "record_pa_decision"}
+  }
+
+def no_decision_reason(message) -> str:
+  if message.stop_reason == "max_tokens":
+    return "Decision truncated at max_tokens; manual review required"
+  return "Claude did not record a valid decision"
 
-  return PADecision(
+def manual_review_decision(request_id: str, processing_ms: int, failure: str, model: Optional[str] = None) -> PADecision:
+  # Fixed values built here, so skip a second round of Pydantic validation
+  return PADecision.model_construct(
     request_id=request_id,
     processing_time_ms=processing_ms,
-    status=result.get("status", "PENDING_INFO"),
-    decision=result.get("decision", ""),
-    rationale=result.get("rationale", ""),
-    criteria_met=result.get("criteria_met", []),
-    criteria_missing=result.get("criteria_missing", []),
-    alternative_recommendations=result.get("alternative_recommendations", []),
-    appeal_guidance=result.get("appeal_guidance"),
-    confidence=result.get("confidence", 0.5)
+    status="PENDING_INFO",
+    decision="Manual review required",
+    rationale=failure,
+    criteria_met=[],
+    criteria_missing=[DECISION_MISSING],
+    alternative_recommendations=[],
+    appeal_guidance=None,
+    confidence=0.3,
+    model=model
   )
 
-@app.post("/analyze-appeal", response_model=AppealAnalysis)
-async def analyze_appeal(appeal: AppealRequest):
-  prompt = f"""You are a prior authorization appeal specialist AI agent.
+def build_pa_decision(result: Optional[dict], request_id: str, processing_ms: int, placeholders: tuple = (), model: Optional[str] = None) -> Optional[PADecision]:
+  """Validate Claude's record_pa_decision input; None if it is missing or does not fit PADecision.
+
+  Tool input is model output: the schema is a hint, not a guarantee, so it goes
+  through the normal constructor (e.g. a "0.8" confidence must become a float
+  before the cache compares it).
+  """
+  if result is None:
+    return None
+  try:
+    return PADecision(
+      request_id=request_id,
+      processing_time_ms=processing_ms,
+      status=result.get("status", "PENDING_INFO"),
+      decision=restore_phi(result.get("decision", ""), placeholders),
+      rationale=restore_phi(result.get("rationale", ""), placeholders),
+      criteria_met=restore_phi(result.get("criteria_met", []), placeholders),
+      criteria_missing=restore_phi(result.get("criteria_missing", []), placeholders),
+      alternative_recommendations=restore_phi(result.get("alternative_recommendations", []), placeholders),
+      appeal_guidance=restore_phi(result.get("appeal_guidance"), placeholders),
+      confidence=result.get("confidence", 0.5),
+      model=model
+    )
+  except ValidationError:
+    return None
+
+async def decide_pa(request: PARequest, request_id: str, start_time: float, insurance_criteria: Optional[dict] = None) -> PADecision:
+  """Real-time PA decision shared by /submit-pa and the batch fallback.
+
+  Checks the decision cache, calls Claude (retrying once on the top tier if a
+  cheaper tier was truncated) and caches any recorded decision.
+  """
+  model, max_tokens = choose_model(request)
+  cache_key = decision_cache_key(request, model)
+  cached = DECISION_CACHE.get(cache_key)
+  if cached is not None:
+    cache_stats["hits"] += 1
+    processing_ms = int((time.perf_counter() - start_time) * 1000)
+    return cached.model_copy(update={
+      "request_id": request_id,
+      "processing_time_ms": processing_ms,
+      "confidence": min(cached.confidence, CACHE_CONFIDENCE_CAP)
+    })
+  cache_stats["misses"] += 1
+
+  # Coverage criteria are only needed on a miss, so cache hits never touch CMS
+  if insurance_criteria is None:
+    insurance_criteria = await insurance_criteria_for(request)
+  prompt, placeholders = build_pa_prompt(request, request_id, insurance_criteria)
+
+  response = await claude.create(**pa_message_params(prompt, model, max_tokens))
+  if response.stop_reason == "max_tokens" and (model, max_tokens) != COMPLEX_PA_MODEL:
+    # The cheaper tier ran out of room mid-decision; retry once on the top tier
+    model, max_tokens = COMPLEX_PA_MODEL
+    response = await claude.create(**pa_message_params(prompt, model, max_tokens))
+  result = tool_use_input(response)
+
+  processing_ms = int((time.perf_counter() - start_time) * 1000)
+  decision = build_pa_decision(result, request_id, processing_ms, placeholders, model)
+  if decision is None:
+    return manual_review_decision(request_id, processing_ms, no_decision_reason(response), model)
+  DECISION_CACHE[cache_key] = decision
+  return decision
+
+@app.post("/submit-pa", response_model=PADecision)
+async def submit_prior_auth(request: PARequest):
+  start_time = time.perf_counter()
+  return await decide_pa(request, f"PA-{str(uuid4())[:8].upper()}", start_time)
+
+@app.post("/submit-pa-batch", response_model=PABatchJob)
+async def submit_prior_auth_batch(requests: List[PARequest]):
+  """Queue non-interactive PAs on the Message Batches API (half-price, separate rate limits)."""
+  if not requests:
+    raise HTTPException(status_code=400, detail="Batch must contain at least one PA request")
+  start_time = time.perf_counter()
+  request_ids = [f"PA-{str(uuid4())[:8].upper()}" for _ in requests]
+  insurance = await asyncio.gather(*(insurance_criteria_for(r) for r in requests))
+  # No redaction here: results are fetched later, possibly by another worker or
+  # after a restart, so an in-process placeholder map could not restore them
+  prompts = [build_pa_prompt(r, rid, ic, redact=False) for r, rid, ic in zip(requests, request_ids, insurance)]
+  params = [pa_message_params(prompt, *choose_model(r)) for r, (prompt, _) in zip(requests, prompts)]
+
+  try:
+    batch = await aclient.messages.batches.create(
+      requests=[{"custom_id": rid, "params": p} for rid, p in zip(request_ids, params)]
+    )
+  except anthropic.APIError:
+    # Batch queue unavailable: answer small batches in real time rather than dropping the work
+    if len(params) > REALTIME_FALLBACK_LIMIT:
+      raise HTTPException(status_code=503, detail="Batch queue unavailable; retry later", headers={"Retry-After": "30"})
+    # Same path as /submit-pa (cache, redaction, top-tier retry on truncation). One shed or
+    # failed call must not fail the whole batch and orphan the calls that succeeded
+    results = await asyncio.gather(
+      *(decide_pa(r, rid, start_time, ic) for r, rid, ic in zip(requests, request_ids, insurance)),
+      return_exceptions=True
+    )
+    processing_ms = int((time.perf_counter() - start_time) * 1000)
+    decisions = []
+    for result, rid in zip(results, request_ids):
+      if isinstance(result, (ClaudeOverloaded, anthropic.APIError)):
+        decisions.append(manual_review_decision(rid, processing_ms, f"Claude unavailable ({type(result).__name__}); resubmit via /submit-pa"))
+      elif isinstance(result, BaseException):
+        raise result
+      else:
+        decisions.append(result)
+    return PABatchJob(batch_id=None, status="ended", request_ids=request_ids, decisions=decisions)
+
+  return PABatchJob(batch_id=batch.id, status=batch.processing_status, request_ids=request_ids)
+
+@app.get("/batch/{batch_id}", response_model=PABatchJob)
+async def get_prior_auth_batch(batch_id: str):
+  try:
+    batch = await aclient.messages.batches.retrieve(batch_id)
+  except anthropic.NotFoundError:
+    raise HTTPException(status_code=404, detail=f"No batch found with id {batch_id}")
+  if batch.processing_status != "ended":
+    return PABatchJob(batch_id=batch.id, status=batch.processing_status)
 
-Original Request ID: {appeal.original_request_id}
-Denial Reason: {appeal.denial_reason}
-Additional Clinical Evidence: {appeal.additional_clinical_evidence}
-Physician Statement: {appeal.physician_statement or 'not provided'}
+  processing_ms = int((batch.ended_at - batch.created_at).total_seconds() * 1000)
+  decisions = []
+  async for entry in await aclient.messages.batches.results(batch_id):
+    if entry.result.type == "succeeded":
+      message = entry.result.message
+      decisions.append(
+        build_pa_decision(tool_use_input(message), entry.custom_id, processing_ms, model=message.model)
+        or manual_review_decision(entry.custom_id, processing_ms, no_decision_reason(message), message.model)
+      )
+    else:
+      decisions.append(manual_review_decision(entry.custom_id, processing_ms, f"Batch request {entry.result.type}; resubmit via /submit-pa"))
 
-Analyze this appeal and provide strategic guidance as JSON:
-{{"likelihood_of_success": 0.0, "strongest_arguments": ["arg1"], "required_documentation": ["doc1"], "recommended_approach": "strategy", "estimated_review_days": 0}}"""
+  return PABatchJob(
+    batch_id=batch.id,
+    status=batch.processing_status,
+    request_ids=[d.request_id for d in decisions],
+    decisions=decisions
+  )
 
-  response = client.messages.create(
+@app.post("/analyze-appeal", response_model=AppealAnalysis)
+async def analyze_appeal(appeal: AppealRequest):
+  prompt = APPEAL_PROMPT_TEMPLATE.substitute(
+    original_request_id=appeal.original_request_id,
+    denial_reason=appeal.denial_reason,
+    additional_clinical_evidence=appeal.additional_clinical_evidence,
+    physician_statement=appeal.physician_statement or "not provided"
+  )
+
+  response = await claude.create(
     model="claude-opus-4-5",
     max_tokens=900,
-    messages=[{"role": "user", "content": prompt}]
+    messages=[{"role": "user", "content": prompt}],
+    tools=[RECORD_APPEAL_ANALYSIS_TOOL],
+    tool_choice={"type": "tool", "name": "record_appeal_analysis"}
   )
-  text = response.content[0].text
-  start = text.find("{")
-  end = text.rfind("}") + 1
+  appeal_id = f"APL-{str(uuid4())[:6].upper()}"
+  defaults = {"likelihood_of_success": 0.5, "strongest_arguments": [], "required_documentation": [], "recommended_approach": "Manual review required", "estimated_review_days": 30}
+  # Tool input is untrusted model output, so validate it; malformed input gets the same defaults as a missing one
   try:
-    result = json.loads(text[start:end])
-  except json.JSONDecodeError:
-    result = {"likelihood_of_success": 0.5, "strongest_arguments": [], "required_documentation": [], "recommended_approach": text, "estimated_review_days": 30}
-
-  return AppealAnalysis(appeal_id=f"APL-{str(uuid4())[:6].upper()}", **result)
+    return AppealAnalysis.model_validate({**defaults, **(tool_use_input(response) or {}), "appeal_id": appeal_id})
+  except ValidationError:
+    return AppealAnalysis.model_construct(appeal_id=appeal_id, **defaults)
 
 @app.get("/subnet-status", response_model=SubnetStatus)
 def get_subnet_status():
@@ -170,7 +464,9 @@ def get_subnet_status():
     avg_response_time_ms=340,
     requests_processed_24h=1823,
     approval_rate=0.68,
-    network="Bittensor mainnet"
+    network="Bittensor mainnet",
+    cache_hit_rate=cache_stats["hits"] / max(1, cache_stats["hits"] + cache_stats["misses"]),
+    admission_queue=claude.stats()
   )
 
 @app.get("/pa-criteria/{icd_code}")
@@ -186,4 +482,4 @@ def health():
 
 if __name__ == "__main__":
   import uvicorn
-  uvicorn.run(app, host="0.0.0.0", port=8000)
+  uvicorn.run(app, host="0.0.0.0", port=8000, loop="uvloop", http="httptools")
@@ -0,0 +1,102 @@
+"""priorauth-tao: admission-controlled Claude client
+Caps concurrent Claude calls per process and sheds overload early with a
+bounded wait, instead of letting every request's latency collapse together.
+Decisions come back as forced tool calls; `tool_use_input` unwraps them.
+"""
+import asyncio
+import time
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    import anthropic
+
+
+def tool_use_input(message: Any) -> Optional[dict]:
+    """Return the arguments of the forced tool call, or None if it did not complete.
+
+    A reply cut off by `max_tokens` still carries a `tool_use` block, but its
+    input is truncated; only `stop_reason == "tool_use"` means it is whole.
+    """
+    if message.stop_reason != "tool_use":
+        return None
+    for block in message.content:
+        if block.type == "tool_use":
+            return dict(block.input)
+    return None
+
+
+class ClaudeOverloaded(Exception):
+    """Raised when the admission queue is full or a request outlived its queueing SLO."""
+
+
+class ClaudeClient:
+    """Admission control in front of `AsyncAnthropic.messages.create`.
+
+    Callers await `create(...)` exactly as they would on the SDK client. At
+    most `max_concurrency` Claude calls run at once, at most `max_queue_size`
+    requests may wait for a free slot, and a request that waited longer than
+    `max_queue_wait_s` for capacity is shed instead of sent. Both cases raise
+    `ClaudeOverloaded` so handlers can answer 503.
+    """
+
+    def __init__(
+        self,
+        aclient: "anthropic.AsyncAnthropic",
+        max_queue_size: int = 256,
+        max_concurrency: int = 128,
+        max_queue_wait_s: float = 5.0,
+    ):
+        self.aclient = aclient
+        self.max_queue_size = max_queue_size
+        self.max_concurrency = max_concurrency
+        self.max_queue_wait_s = max_queue_wait_s
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._waiting = 0
+        self._running = 0
+        self._shed = 0
+        self._queue_wait_s = 0.0
+        self._claude_s = 0.0
+        self._calls = 0
+
+    async def create(self, **kwargs: Any) -> Any:
+        await self._admit()
+        self._running += 1
+        started = time.perf_counter()
+        try:
+            return await self.aclient.messages.create(**kwargs)
+        finally:
+            self._claude_s += time.perf_counter() - started
+            self._calls += 1
+            self._running -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        """Queue depth, in-flight calls and mean per-stage latency."""
+        return {
+            "queue_depth": self._waiting,
+            "inflight_calls": self._running,
+            "shed_requests": self._shed,
+            "avg_queue_wait_ms": 1000 * self._queue_wait_s / self._calls if self._calls else 0.0,
+            "avg_claude_ms": 1000 * self._claude_s / self._calls if self._calls else 0.0,
+        }
+
+    async def _admit(self) -> None:
+        if not self._slots.locked():
+            await self._slots.acquire()
+            return
+        if self._waiting >= self.max_queue_size:
+            self._shed += 1
+            raise ClaudeOverloaded(f"admission queue full ({self.max_queue_size} waiting)")
+        # The SLO covers time spent waiting for capacity, not Claude's own latency.
+        self._waiting += 1
+        enqueued_at = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.max_queue_wait_s)
+        except asyncio.TimeoutError:
+            self._shed += 1
+            raise ClaudeOverloaded(
+                f"waited {time.perf_counter() - enqueued_at:.1f}s for capacity, over the {self.max_queue_wait_s}s SLO"
+            ) from None
+        finally:
+            self._waiting -= 1
+        self._queue_wait_s += time.perf_counter() - enqueued_at
@@ -0,0 +1 @@
+# Lets pytest import the top-level service modules (agent, miner, claude_client, ...) from tests/.
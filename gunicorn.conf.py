@@ -0,0 +1,14 @@
+"""Gunicorn settings for running agent.py / miner.py across all CPU cores.
+
+Each worker is a separate process with its own event loop, HTTP pool, caches
+and Claude admission queue; nothing is shared between workers.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+# One async worker per core: each event loop already multiplexes many requests, and
+# extra processes only split the caches and admission queue further
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn_worker.UvicornWorker"
+keepalive = 30
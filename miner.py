@@ -4,18 +4,31 @@ and returns structured approval/denial decisions scored by validators.
 """
 import os
 import time
-import json
+import orjson
 import asyncio
+import hashlib
 from dataclasses import dataclass
+from string import Template
 from typing import Optional
 import anthropic
-from fastapi import FastAPI
-from pydantic import BaseModel
+import numpy as np
+from cachetools import TTLCache
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ValidationError
+from claude_client import ClaudeClient, ClaudeOverloaded, tool_use_input
+from phi_redaction import redact_phi, restore_phi
 
 app = FastAPI(title="PriorAuth-Tao Miner", version="1.0.0")
 
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
-client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+aclient = anthropic.AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
+claude = ClaudeClient(aclient, max_queue_size=256, max_concurrency=128)
+
+@app.exception_handler(ClaudeOverloaded)
+async def claude_overloaded_handler(request, exc: ClaudeOverloaded):
+    """Shed load with 503 + Retry-After instead of letting every request's latency collapse."""
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
 
 # --- Data Models ---
 class PARequest(BaseModel):
@@ -27,6 +40,7 @@ class PARequest(BaseModel):
     clinical_notes: str
     insurance_plan: str
     prior_treatments: Optional[list[str]] = []
+    parallel: bool = False  # fan out one Claude call per ICD-10 code instead of joint reasoning
 
 class PADecision(BaseModel):
     request_id: str
@@ -37,6 +51,10 @@ class PADecision(BaseModel):
     appeal_guidance: Optional[str] = None
     processing_time_ms: int
 
+class ScoreBatchRequest(BaseModel):
+    decisions: list[PADecision]
+    ground_truth: Optional[list[Optional[bool]]] = None
+
 # --- PAYER GUIDELINES (simplified MCG/InterQual-like rules) ---
 PAYER_GUIDELINES = {
     "default": """
@@ -49,91 +67,212 @@ PAYER_GUIDELINES = {
     """
 }
 
+# --- Prompt template (compiled once at import) ---
+PA_PROMPT_TEMPLATE = Template("""You are a clinical prior authorization specialist AI.
+    
+Review this PA request against evidence-based medical guidelines:
+
+Patient: $patient_age years old
+Diagnosis (ICD-10): $diagnosis_codes
+Requested Procedure/Service (CPT): $procedure_codes
+Medication: $medication
+Prior treatments tried: $prior_treatments
+Clinical Notes: $clinical_notes
+Insurance Plan: $insurance_plan
+
+Payer Guidelines:
+$guidelines
+
+Record your decision with the record_pa_decision tool.
+
+Base your decision purely on medical necessity criteria and clinical evidence.""")
+
+# --- Structured output: Claude fills this tool's input instead of free-text JSON ---
+RECORD_PA_DECISION_TOOL = {
+    "name": "record_pa_decision",
+    "description": "Record the prior authorization decision for this request.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "approved": {"type": "boolean"},
+            "rationale": {"type": "string", "description": "Clinical reasoning in 2-3 sentences"},
+            "confidence": {"type": "number", "minimum": 0, "maximum": 1},
+            "suggested_alternatives": {"type": "array", "items": {"type": "string"}},
+            "appeal_guidance": {"type": ["string", "null"], "description": "If denied, what additional info would support appeal"},
+        },
+        "required": ["approved", "rationale", "confidence", "suggested_alternatives"],
+    },
+}
+
+# --- Decision cache for clinically equivalent requests ---
+MODEL = "claude-opus-4-5"
+DECISION_CACHE = TTLCache(maxsize=4096, ttl=3600)
+CACHE_CONFIDENCE_CAP = 0.9
+cache_stats = {"hits": 0, "misses": 0}
+
+def decision_cache_key(request: PARequest, model: str) -> str:
+    """Hash the coded fields plus normalized notes; any clinical difference is a miss."""
+    fields = [
+        model,
+        sorted(code.strip().upper() for code in request.diagnosis_codes),
+        sorted(code.strip().upper() for code in request.procedure_codes),
+        (request.medication or "").strip().lower(),
+        request.insurance_plan.strip().lower(),
+        request.patient_age,
+        sorted({t.strip().lower() for t in request.prior_treatments or []}),
+        " ".join(request.clinical_notes.lower().split()),
+    ]
+    return hashlib.sha256(orjson.dumps(fields)).hexdigest()
+
 # --- Claude-powered PA Decision Engine ---
 async def process_pa_with_claude(request: PARequest) -> PADecision:
-    start = time.time()
+    start = time.perf_counter()
+    
+    if request.parallel and len(request.diagnosis_codes) > 1:
+        subs = [
+            request.model_copy(update={"diagnosis_codes": [code], "parallel": False})
+            for code in request.diagnosis_codes
+        ]
+        # One shed or failed code must not fail the whole request while its siblings are still billed
+        results = await asyncio.gather(*(process_pa_with_claude(sub) for sub in subs), return_exceptions=True)
+        elapsed_ms = int((time.perf_counter() - start) * 1000)
+        for i, (sub, result) in enumerate(zip(subs, results)):
+            if isinstance(result, (ClaudeOverloaded, anthropic.APIError)):
+                results[i] = failed_decision(sub, result, elapsed_ms)
+            elif isinstance(result, BaseException):
+                raise result
+        return merge_decisions(request, results, elapsed_ms)
+    
+    cache_key = decision_cache_key(request, MODEL)
+    cached = DECISION_CACHE.get(cache_key)
+    if cached is not None:
+        cache_stats["hits"] += 1
+        return cached.model_copy(update={
+            "request_id": request.request_id,
+            "confidence": min(cached.confidence, CACHE_CONFIDENCE_CAP),
+            "processing_time_ms": int((time.perf_counter() - start) * 1000),
+        })
+    cache_stats["misses"] += 1
     
     guidelines = PAYER_GUIDELINES.get(request.insurance_plan, PAYER_GUIDELINES["default"])
     
-    prompt = f"""You are a clinical prior authorization specialist AI.
+    # PHI in free text goes out as typed placeholders and is restored in the reply
+    redacted, placeholders = redact_phi(request.clinical_notes, *(request.prior_treatments or []))
+    prior_treatments = list(redacted[1:])
     
-Review this PA request against evidence-based medical guidelines:
-
-Patient: {request.patient_age} years old
-Diagnosis (ICD-10): {', '.join(request.diagnosis_codes)}
-Requested Procedure/Service (CPT): {', '.join(request.procedure_codes)}
-Medication: {request.medication or 'N/A'}
-Prior treatments tried: {', '.join(request.prior_treatments) if request.prior_treatments else 'None documented'}
-Clinical Notes: {request.clinical_notes}
-Insurance Plan: {request.insurance_plan}
-
-Payer Guidelines:
-{guidelines}
-
-Provide your decision as JSON:
-{{
-  "approved": true/false,
-  "rationale": "clinical reasoning in 2-3 sentences",
-  "confidence": 0.0-1.0,
-  "suggested_alternatives": ["alternative1", "alternative2"],
-  "appeal_guidance": "if denied, what additional info would support appeal"
-}}
-
-Base your decision purely on medical necessity criteria and clinical evidence."""
+    prompt = PA_PROMPT_TEMPLATE.substitute(
+        patient_age=request.patient_age,
+        diagnosis_codes=', '.join(request.diagnosis_codes),
+        procedure_codes=', '.join(request.procedure_codes),
+        medication=request.medication or 'N/A',
+        prior_treatments=', '.join(prior_treatments) if prior_treatments else 'None documented',
+        clinical_notes=redacted[0],
+        insurance_plan=request.insurance_plan,
+        guidelines=guidelines,
+    )
     
-    response = client.messages.create(
-        model="claude-opus-4-5",
+    response = await claude.create(
+        model=MODEL,
         max_tokens=1024,
-        messages=[{"role": "user", "content": prompt}]
+        messages=[{"role": "user", "content": prompt}],
+        tools=[RECORD_PA_DECISION_TOOL],
+        tool_choice={"type": "tool", "name": "record_pa_decision"}
     )
     
-    elapsed_ms = int((time.time() - start) * 1000)
+    elapsed_ms = int((time.perf_counter() - start) * 1000)
     
-    try:
-        text = response.content[0].text
-        # Extract JSON from response
-        start_idx = text.find("{")
-        end_idx = text.rfind("}") + 1
-        decision_json = json.loads(text[start_idx:end_idx])
-        
-        return PADecision(
-            request_id=request.request_id,
-            approved=decision_json.get("approved", False),
-            rationale=decision_json.get("rationale", ""),
-            confidence=decision_json.get("confidence", 0.5),
-            suggested_alternatives=decision_json.get("suggested_alternatives", []),
-            appeal_guidance=decision_json.get("appeal_guidance"),
-            processing_time_ms=elapsed_ms
-        )
-    except (json.JSONDecodeError, IndexError, KeyError) as e:
-        return PADecision(
+    decision_json = tool_use_input(response)
+    decision = None
+    if decision_json is not None:
+        # Tool input is untrusted model output: validate it (a "0.8" confidence must
+        # become a float before a cache hit compares it against the cap)
+        try:
+            decision = PADecision(
+                request_id=request.request_id,
+                approved=decision_json.get("approved", False),
+                rationale=restore_phi(decision_json.get("rationale", ""), placeholders),
+                confidence=decision_json.get("confidence", 0.5),
+                suggested_alternatives=restore_phi(decision_json.get("suggested_alternatives", []), placeholders),
+                appeal_guidance=restore_phi(decision_json.get("appeal_guidance"), placeholders),
+                processing_time_ms=elapsed_ms
+            )
+        except ValidationError:
+            pass
+    if decision is None:
+        return PADecision.model_construct(
             request_id=request.request_id,
             approved=False,
-            rationale=f"Processing error: {str(e)}. Manual review required.",
+            rationale=f"Processing error: no valid decision recorded (stop_reason={response.stop_reason}). Manual review required.",
             confidence=0.0,
             suggested_alternatives=[],
             processing_time_ms=elapsed_ms
         )
+    DECISION_CACHE[cache_key] = decision
+    return decision
+
+def failed_decision(request: PARequest, exc: Exception, elapsed_ms: int) -> PADecision:
+    """Manual-review stand-in for a sub-decision whose Claude call failed."""
+    return PADecision.model_construct(
+        request_id=request.request_id,
+        approved=False,
+        rationale=f"Processing error: Claude unavailable ({type(exc).__name__}). Manual review required.",
+        confidence=0.0,
+        suggested_alternatives=[],
+        appeal_guidance=None,
+        processing_time_ms=elapsed_ms
+    )
+
+def merge_decisions(request: PARequest, results: list[PADecision], elapsed_ms: int) -> PADecision:
+    """Combine per-diagnosis decisions: approve only if every code is approved."""
+    alternatives = list(dict.fromkeys(alt for r in results for alt in r.suggested_alternatives))
+    guidance = [f"{code}: {r.appeal_guidance}" for code, r in zip(request.diagnosis_codes, results) if r.appeal_guidance]
+    return PADecision.model_construct(
+        request_id=request.request_id,
+        approved=all(r.approved for r in results),
+        rationale=" ".join(f"[{code}] {r.rationale}" for code, r in zip(request.diagnosis_codes, results)),
+        confidence=min(r.confidence for r in results),
+        suggested_alternatives=alternatives,
+        appeal_guidance="\n".join(guidance) or None,
+        processing_time_ms=elapsed_ms
+    )
 
 # --- Validator Scoring (Bittensor subnet logic) ---
 def score_decision(decision: PADecision, ground_truth: Optional[bool] = None) -> float:
     """Score miner decisions for Bittensor reward mechanism."""
-    score = 0.0
-    # Confidence calibration
-    score += decision.confidence * 0.4
-    # Completeness of rationale
-    score += min(len(decision.rationale) / 200, 1.0) * 0.3
-    # Alternatives provided
-    score += min(len(decision.suggested_alternatives) / 3, 1.0) * 0.2
-    # Appeal guidance (only for denials)
-    if not decision.approved and decision.appeal_guidance:
-        score += 0.1
+    # Confidence calibration, completeness of rationale, alternatives provided,
+    # appeal guidance (only for denials)
+    score = (
+        0.4 * decision.confidence
+        + 0.3 * min(len(decision.rationale) / 200, 1.0)
+        + 0.2 * min(len(decision.suggested_alternatives) / 3, 1.0)
+        + 0.1 * (not decision.approved and bool(decision.appeal_guidance))
+    )
     # Ground truth accuracy (when available from outcome data)
     if ground_truth is not None:
-        accuracy_bonus = 0.3 if decision.approved == ground_truth else -0.1
-        score = min(1.0, score + accuracy_bonus)
+        score += 0.3 if decision.approved == ground_truth else -0.1
     return min(1.0, max(0.0, score))
 
+def score_decisions(decisions: list[PADecision], ground_truth: Optional[list[Optional[bool]]] = None) -> np.ndarray:
+    """Score a batch of miner decisions in one vectorized pass; same weights as `score_decision`."""
+    # One Python pass pulls every field; the arithmetic below runs on whole columns
+    fields = np.array(
+        [(d.confidence, len(d.rationale), len(d.suggested_alternatives), d.approved, bool(d.appeal_guidance)) for d in decisions],
+        dtype=np.float64,
+    ).reshape(-1, 5)
+    confidence, rationale_len, alternatives_len, approved, has_appeal = fields.T
+    approved = approved.astype(bool)
+    scores = (
+        0.4 * confidence
+        + 0.3 * np.minimum(rationale_len / 200, 1.0)
+        + 0.2 * np.minimum(alternatives_len / 3, 1.0)
+        + 0.1 * (~approved & has_appeal.astype(bool))
+    )
+    if ground_truth is not None:
+        truth = np.array([np.nan if g is None else float(g) for g in ground_truth], dtype=np.float64)
+        bonus = np.where(approved == (truth == 1.0), 0.3, -0.1)
+        scores += np.where(np.isnan(truth), 0.0, bonus)
+    return np.clip(scores, 0.0, 1.0)
+
 # --- API Endpoints ---
 @app.post("/process", response_model=PADecision)
 async def process_authorization(request: PARequest):
@@ -146,10 +285,28 @@ async def score_miner_decision(decision: PADecision, ground_truth: Optional[bool
     score = score_decision(decision, ground_truth)
     return {"request_id": decision.request_id, "score": score, "validator": "priorauth-tao-v1"}
 
+@app.post("/score-batch")
+async def score_miner_decisions(batch: ScoreBatchRequest):
+    """Validator endpoint: score many miner PA decisions at once."""
+    if batch.ground_truth is not None and len(batch.ground_truth) != len(batch.decisions):
+        raise HTTPException(status_code=422, detail="ground_truth must have one entry per decision")
+    scores = score_decisions(batch.decisions, batch.ground_truth)
+    return {
+        "scores": [{"request_id": d.request_id, "score": float(s)} for d, s in zip(batch.decisions, scores)],
+        "validator": "priorauth-tao-v1",
+    }
+
 @app.get("/health")
 async def health():
-    return {"status": "online", "subnet": "priorauth-tao", "model": "claude-opus-4-5"}
+    lookups = cache_stats["hits"] + cache_stats["misses"]
+    return {
+        "status": "online",
+        "subnet": "priorauth-tao",
+        "model": MODEL,
+        "cache_hit_rate": cache_stats["hits"] / lookups if lookups else 0.0,
+        "admission_queue": claude.stats(),
+    }
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+    uvicorn.run(app, host="0.0.0.0", port=8001, loop="uvloop", http="httptools")
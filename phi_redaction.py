@@ -0,0 +1,67 @@
+"""priorauth-tao: placeholder redaction of PHI in prompt text
+Swaps identifiers in clinical notes for short typed tags (<NAME_1>, <MRN_1>, ...)
+before they reach Claude, and maps the tags back in the returned rationale.
+"""
+import re
+from functools import lru_cache, partial
+
+# Order matters: more specific numeric patterns run before the broader ones.
+PHI_PATTERNS = [
+    ("SSN", re.compile(r"\b\d{3}-\d{2}-\d{4}\b")),
+    # Only the label is case-insensitive; the identifier must contain a digit so
+    # "medical record reviewed" is left alone
+    ("MRN", re.compile(r"\b(?i:MRN|Medical Record(?: Number)?)\s*[:#]?\s*(?=[A-Z0-9-]*\d)[A-Z0-9-]{5,}\b")),
+    ("EMAIL", re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b")),
+    ("PHONE", re.compile(r"(?<!\d)(?:\(\d{3}\)\s?|\d{3}[-.\s])\d{3}[-.]\d{4}\b")),
+    # Dates are deliberately not redacted: criteria such as "6 weeks conservative
+    # treatment" are judged from the intervals between them.
+    # The optional surname may not be another title, or "Dr. Smith Dr. Smith"
+    # would swallow the second "Dr" and leave "Smith" in the prompt.
+    ("NAME", re.compile(r"\b(?:Mr|Mrs|Ms|Miss|Dr)\.? [A-Z][a-z]+(?: (?!(?:Mr|Mrs|Ms|Miss|Dr)\b)[A-Z][a-z]+)?")),
+]
+
+
+def _tag(kind: str, placeholders: dict, counters: dict, match: re.Match) -> str:
+    original = match.group(0)
+    tag = placeholders.get(original)
+    if tag is None:
+        counters[kind] = counters.get(kind, 0) + 1
+        tag = f"<{kind}_{counters[kind]}>"
+        placeholders[original] = tag
+    return tag
+
+
+@lru_cache(maxsize=4096)
+def redact_phi(*texts: str) -> tuple[tuple[str, ...], tuple[tuple[str, str], ...]]:
+    """Redact all texts with one shared numbering.
+
+    Returns the redacted texts and `(tag, original)` pairs for `restore_phi`.
+    Repeated values map to the same tag, so a name mentioned five times costs
+    one placeholder's worth of tokens each time. Results are memoized on the
+    input text.
+    """
+    placeholders: dict[str, str] = {}
+    counters: dict[str, int] = {}
+    redacted = []
+    for text in texts:
+        for kind, pattern in PHI_PATTERNS:
+            text = pattern.sub(partial(_tag, kind, placeholders, counters), text)
+        redacted.append(text)
+    return tuple(redacted), tuple((tag, original) for original, tag in placeholders.items())
+
+
+def restore_phi(text, placeholders: tuple[tuple[str, str], ...]):
+    """Put the original values back wherever Claude echoed a placeholder.
+
+    Accepts a single string or a list of strings (criteria, alternatives).
+    """
+    if not text or not placeholders:
+        return text
+    if isinstance(text, list):
+        return [restore_phi(item, placeholders) for item in text]
+    if not isinstance(text, str):
+        # Malformed model output; leave it for Pydantic validation to reject
+        return text
+    for tag, original in placeholders:
+        text = text.replace(tag, original)
+    return text
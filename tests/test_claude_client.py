@@ -0,0 +1,81 @@
+import asyncio
+from types import SimpleNamespace
+
+from claude_client import ClaudeClient, ClaudeOverloaded, tool_use_input
+
+
+class SlowMessages:
+    def __init__(self, latency_s):
+        self.latency_s = latency_s
+        self.concurrent = 0
+        self.peak = 0
+
+    async def create(self, **kwargs):
+        self.concurrent += 1
+        self.peak = max(self.peak, self.concurrent)
+        try:
+            await asyncio.sleep(self.latency_s)
+            return kwargs["n"]
+        finally:
+            self.concurrent -= 1
+
+
+class StubClient:
+    def __init__(self, latency_s):
+        self.messages = SlowMessages(latency_s)
+
+
+def test_trickle_load_is_not_serialized_behind_slow_calls():
+    # Requests arriving one at a time must not queue behind earlier Claude calls:
+    # with a 0.3s SLO and 0.6s calls, any serialization would shed requests.
+    stub = StubClient(latency_s=0.6)
+    claude = ClaudeClient(stub, max_concurrency=64, max_queue_wait_s=0.3)
+
+    async def trickle():
+        tasks = []
+        for n in range(8):
+            tasks.append(asyncio.create_task(claude.create(n=n)))
+            await asyncio.sleep(0.05)
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(trickle())
+    assert results == list(range(8))
+    assert stub.messages.peak == 8
+
+
+def test_sheds_when_capacity_wait_exceeds_slo():
+    stub = StubClient(latency_s=0.3)
+    claude = ClaudeClient(stub, max_concurrency=2, max_queue_wait_s=0.1)
+
+    async def burst():
+        return await asyncio.gather(*(claude.create(n=n) for n in range(4)), return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert results[:2] == [0, 1]
+    assert all(isinstance(r, ClaudeOverloaded) for r in results[2:])
+    assert stub.messages.peak == 2
+
+
+def test_rejects_when_waiting_queue_is_full():
+    stub = StubClient(latency_s=0.1)
+    claude = ClaudeClient(stub, max_concurrency=1, max_queue_size=2)
+
+    async def burst():
+        return await asyncio.gather(*(claude.create(n=n) for n in range(5)), return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert results[:3] == [0, 1, 2]
+    assert all(isinstance(r, ClaudeOverloaded) for r in results[3:])
+
+
+def _message(stop_reason, tool_input):
+    block = SimpleNamespace(type="tool_use", input=tool_input)
+    return SimpleNamespace(stop_reason=stop_reason, content=[block])
+
+
+def test_tool_use_input_returns_complete_tool_call():
+    assert tool_use_input(_message("tool_use", {"approved": True})) == {"approved": True}
+
+
+def test_tool_use_input_rejects_truncated_tool_call():
+    assert tool_use_input(_message("max_tokens", {"approved": True})) is None
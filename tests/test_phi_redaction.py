@@ -0,0 +1,36 @@
+from phi_redaction import redact_phi, restore_phi
+
+
+def test_mrn_requires_a_digit():
+    (text,), placeholders = redact_phi("Medical record reviewed; MRN: A12345 on file")
+    assert text == "Medical record reviewed; <MRN_1> on file"
+    assert placeholders == (("<MRN_1>", "MRN: A12345"),)
+
+
+def test_mrn_identifier_is_case_sensitive():
+    (text,), placeholders = redact_phi("mrn documented elsewhere")
+    assert text == "mrn documented elsewhere"
+    assert placeholders == ()
+
+
+def test_dates_are_kept_so_intervals_survive():
+    (text,), placeholders = redact_phi("PT from 01/02/2024 to 03/01/2024")
+    assert text == "PT from 01/02/2024 to 03/01/2024"
+    assert placeholders == ()
+
+
+def test_name_does_not_swallow_a_following_title():
+    (text,), placeholders = redact_phi("Dr. Smith Dr. Smith")
+    assert text == "<NAME_1> <NAME_1>"
+    assert placeholders == (("<NAME_1>", "Dr. Smith"),)
+
+
+def test_restore_handles_lists():
+    (_,), placeholders = redact_phi("Seen by Dr. Smith, MRN: 12345")
+    restored = restore_phi(["<NAME_1> notes", "record <MRN_1>"], placeholders)
+    assert restored == ["Dr. Smith notes", "record MRN: 12345"]
+
+
+def test_restore_leaves_non_strings_for_validation():
+    (_,), placeholders = redact_phi("Seen by Dr. Smith")
+    assert restore_phi(["<NAME_1> notes", 3], placeholders) == ["Dr. Smith notes", 3]
@@ -0,0 +1,31 @@
+from miner import PADecision, score_decision, score_decisions
+
+
+def decision(approved, confidence, rationale_len, alternatives, appeal):
+    return PADecision(
+        request_id="REQ-1",
+        approved=approved,
+        rationale="x" * rationale_len,
+        confidence=confidence,
+        suggested_alternatives=[f"alt-{i}" for i in range(alternatives)],
+        appeal_guidance="Submit PT notes" if appeal else None,
+        processing_time_ms=10,
+    )
+
+
+def test_batch_scores_match_scalar_scores():
+    decisions = [
+        decision(True, 0.9, 250, 3, False),
+        decision(False, 0.6, 120, 1, True),
+        decision(False, 0.1, 0, 0, False),
+        decision(True, 1.0, 400, 5, True),
+        decision(False, 0.95, 199, 2, True),
+    ]
+    for truth in (None, [True, False, True, None, False], [False, True, None, False, True]):
+        batch = score_decisions(decisions, truth)
+        per_item = [score_decision(d, None if truth is None else t) for d, t in zip(decisions, truth or [None] * len(decisions))]
+        assert batch.tolist() == per_item
+
+
+def test_empty_batch_scores_nothing():
+    assert score_decisions([]).tolist() == []